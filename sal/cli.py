@@ -1,6 +1,5 @@
 """CLI entry point for sal."""
 import argparse
-import json
 import sys
 from pathlib import Path
 
@@ -9,18 +8,34 @@ import anthropic
 import sal.core as core
 
 
-def _cmd_init():
+def _client() -> anthropic.Anthropic:
+    # The SDK's pool limits already exceed the indexing concurrency, but idle
+    # connections expire after 5 s, shorter than the 10 s batch poll interval or
+    # a long gap between indexing requests. Keep them for a minute so TLS
+    # sessions get reused.
+    limits = anthropic.DEFAULT_CONNECTION_LIMITS
+    limits = type(limits)(max_connections=limits.max_connections,
+                          max_keepalive_connections=limits.max_keepalive_connections,
+                          keepalive_expiry=60.0)
+    return anthropic.Anthropic(api_key=core.get_api_key(), max_retries=5,
+                               http_client=anthropic.DefaultHttpxClient(limits=limits))
+
+
+def _cmd_init(args):
     core.WS = Path.cwd()
-    client = anthropic.Anthropic(api_key=core.get_api_key(), max_retries=5)
-    cards = core.ensure_indexed(client)
+    client = _client()
+    cards = core.ensure_indexed(client, batch=not args.no_batch)
     print(f"\n{len(cards)} document(s) indexed in {core.WS}")
 
 
 def _cmd_ls():
-    index_dir = Path.cwd() / ".sal" / "index"
-    if not index_dir.exists():
+    core.WS = Path.cwd()
+    if not (core.WS / ".sal" / "index").exists():
         sys.exit("Not indexed. Run: sal init")
-    cards = [json.loads(p.read_text()) for p in sorted(index_dir.glob("*.json"))]
+    db = core._open_db()
+    cards = list(core.load_cards(db)[0].values())
+    db.commit()
+    db.close()
     if not cards:
         sys.exit("No documents indexed. Run: sal init")
     print(f"\n{len(cards)} document(s) in {Path.cwd()}\n")
@@ -41,18 +56,21 @@ def _cmd_ls():
 
 def _cmd_serve(args):
     core.WS = Path(args.resources).resolve() if args.resources else Path.cwd()
-    client = anthropic.Anthropic(api_key=core.get_api_key(), max_retries=5)
+    client = _client()
     core.CARDS[:] = core.ensure_indexed(client)
+    core.rebuild_cards_index()
     from sal.web import app
     print(f"\nServing {len(core.CARDS)} document(s) at http://localhost:{args.port}")
-    app.run(host="localhost", port=args.port)
+    app.run(host="localhost", port=args.port, threaded=True)
 
 
 def main():
     parser = argparse.ArgumentParser(prog="sal")
     parser.add_argument("--resources", help="Resources directory (MCP server mode)")
     subparsers = parser.add_subparsers(dest="command")
-    subparsers.add_parser("init", help="Index documents in current directory")
+    init_parser = subparsers.add_parser("init", help="Index documents in current directory")
+    init_parser.add_argument("--no-batch", action="store_true",
+                             help="Index with concurrent requests instead of a batch job")
     subparsers.add_parser("ls", help="List indexed documents in current directory")
     serve_parser = subparsers.add_parser("serve", help="Start web UI")
     serve_parser.add_argument("--port", type=int, default=8888, help="Port (default: 8888)")
@@ -61,7 +79,7 @@ def main():
     args = parser.parse_args()
 
     if args.command == "init":
-        _cmd_init()
+        _cmd_init(args)
     elif args.command == "ls":
         _cmd_ls()
     elif args.command == "serve":
@@ -74,7 +92,8 @@ def main():
             parser.print_help()
             sys.exit(1)
         core.WS = Path(args.resources).resolve()
-        client = anthropic.Anthropic(api_key=core.get_api_key(), max_retries=5)
+        client = _client()
         core.CARDS[:] = core.ensure_indexed(client)
+        core.rebuild_cards_index()
         from sal.mcp import mcp
         mcp.run()
@@ -1,10 +1,38 @@
 """Shared state and logic for sal."""
 import anthropic
 import fitz
-import json, os, sqlite3, sys
+import contextlib, functools, json, os, queue, re, sqlite3, sys, threading, time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
+from typing import Iterator
+
+try:
+    import orjson
+    _loads = orjson.loads
+    def _dumps(obj) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    def to_json(obj, indent: bool = False) -> str:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0).decode()
+except ImportError:
+    _loads = json.loads
+    def _dumps(obj) -> bytes:
+        return json.dumps(obj, indent=2).encode()
+    def to_json(obj, indent: bool = False) -> str:
+        return json.dumps(obj, indent=2 if indent else None)
 
 MODEL       = "claude-opus-4-6"
+SCHEMA      = 4   # search.db layout; bump to rebuild the FTS table on next open
+BATCH_POLL  = 10  # seconds between Message Batches status checks
+WORKERS     = 8   # concurrent card requests when not batching; SAL_INDEX_CONCURRENCY
+RPM, TPM    = 50, 400_000  # request and input-token budget per minute
+PDF_CACHE   = 8   # open PDFs kept around for page reads
+POOL_SIZE   = 8   # idle search.db read connections kept for reuse
+GROUP_TOKENS = 8000       # prompt tokens per shared card request; SAL_BATCH_TOKENS
+GROUP_FILES = 8           # documents per shared card request
+MAX_TOKENS  = 16_000      # output cap; larger non-streaming requests are refused by the SDK
+HEAVY_PAGE  = 1_000_000  # content-stream bytes above which a page is mostly drawing
+HEAVY_SKIP  = 5000       # once the card prefix has this many chars, skip heavy pages
 EXTS        = (".pdf", ".md", ".txt", ".html", ".org")
 CARD_PROMPT = (
     'Extract metadata from this document for an AI tutor. Return JSON only — no prose, no fences:\n'
@@ -15,66 +43,508 @@ CARD_PROMPT = (
     ' "key_results": ["main theorems, equations, or conclusions"]}\n'
     'For PDFs use page numbers (e.g. "p3-5"). For markdown use heading names.\n'
 )
+GROUP_PROMPT = (
+    'The message holds several documents separated by "=====" lines, each starting with a\n'
+    '"path:" line. Return a JSON array with one object per document, shaped as above plus\n'
+    '"index": the 0-based position of the document in the message.\n'
+)
+
+# Full-text extraction for FTS: keep the default mediabox clip but skip ligature
+# and whitespace preservation, which the tokenizer does not need
+_FTS_FLAGS = fitz.TEXT_MEDIABOX_CLIP
+_DECODER = json.JSONDecoder()
+_WORD_RE = re.compile(r"\w+")
+_JSON_START_RE = re.compile(r"[{\[]")
+_TOPIC_PUNCT_RE = re.compile(r"[^\w\s]|_")  # separators to the unicode61 tokenizer
+_FTS_OPERATORS = {"AND", "OR", "NOT", "NEAR"}
 
 # Module-level state, populated at startup
 CARDS: list[dict] = []
+CARDS_BY_PATH: dict[str, dict] = {}
+CARDS_VERSION = 0  # bumped by rebuild_cards_index; keys caches of rendered cards
+# (CARDS list it indexes, its length then, FTS db); a mismatch means the index is stale
+_TOPICS: tuple[list[dict], int, sqlite3.Connection] | None = None
 WS: Path = Path.cwd()
+_POOL: tuple[Path, queue.Queue] | None = None
+_POOL_LOCK = threading.Lock()
+_PDFS: OrderedDict[tuple[str, int], fitz.Document] = OrderedDict()
+_PDFS_LOCK = threading.Lock()
 
 
 def _read_file(path: Path) -> str:
     if path.suffix.lower() == ".pdf":
-        return "\n\n".join(p.get_text() for p in fitz.open(str(path)))
+        return "\n\n".join(p.get_text("text", flags=_FTS_FLAGS) for p in fitz.open(str(path)))
     return path.read_text(errors="replace")
 
 
+@functools.lru_cache(maxsize=PDF_CACHE)
+def _read_file_at(path: str, mtime_ns: int) -> str:
+    return _read_file(Path(path))
+
+
+def _read_file_cached(path: Path) -> str:
+    """_read_file, memoized per (path, mtime) for documents read outside indexing."""
+    return _read_file_at(str(path), path.stat().st_mtime_ns)
+
+
+def _pdf_page(path: Path, page: int) -> str | None:
+    """Text of one PDF page, or None if out of range.
+
+    Documents stay open across calls (keyed by mtime, so edits reopen) to skip
+    re-parsing the xref when successive pages of the same PDF are read.
+    """
+    key = (str(path), path.stat().st_mtime_ns)
+    with _PDFS_LOCK:
+        if (doc := _PDFS.get(key)) is None:
+            doc = _PDFS[key] = fitz.open(key[0])
+            while len(_PDFS) > PDF_CACHE:
+                _PDFS.popitem(last=False)[1].close()
+        _PDFS.move_to_end(key)
+        return doc[page].get_text() if 0 <= page < len(doc) else None
+
+
+def _prefix(text: str, limit: int = 15000) -> str:
+    """Truncate text to at most limit chars, at the last line break if there is one."""
+    if len(text) <= limit:
+        return text
+    cut = text.rfind("\n", 0, limit)
+    return text[:cut if cut > 0 else limit]
+
+
+def _content_size(doc: fitz.Document, page: fitz.Page) -> int:
+    """Stored size of a page's content streams, read from /Length where possible."""
+    size = 0
+    for xref in page.get_contents():
+        kind, value = doc.xref_get_key(xref, "Length")
+        size += int(value) if kind == "int" else len(doc.xref_stream_raw(xref))
+    return size
+
+
+def _read_file_prefix(path: Path, limit: int = 15000) -> str:
+    """_prefix(_read_file(path)), but stop extracting PDF pages once limit is reached."""
+    if path.suffix.lower() != ".pdf":
+        return _prefix(_read_file(path), limit)
+    pages, n = [], 0
+    with fitz.open(str(path)) as doc:
+        for page in doc:
+            if n >= HEAVY_SKIP and _content_size(doc, page) > HEAVY_PAGE:
+                continue
+            # flags=0 skips ligature and whitespace preservation; fine for a card prompt
+            pages.append(page.get_text("text", flags=0))
+            n += len(pages[-1]) + 2
+            if n >= limit:
+                break
+    return _prefix("\n\n".join(pages), limit)
+
+
 def _resources() -> list[Path]:
-    return sorted(f for ext in EXTS for f in WS.glob(f"*{ext}")) if WS.exists() else []
+    if not WS.exists():
+        return []
+    # One directory pass; DirEntry.is_file() reuses the type from readdir
+    with os.scandir(WS) as it:
+        return sorted(Path(e.path) for e in it
+                      if e.name.lower().endswith(EXTS) and e.is_file())
 
 
-def _open_db() -> sqlite3.Connection:
-    db = sqlite3.connect(WS / ".sal" / "search.db")
-    db.execute("CREATE VIRTUAL TABLE IF NOT EXISTS docs USING fts5(path UNINDEXED, body)")
+def _open_db(check_same_thread: bool = True, readonly: bool = False) -> sqlite3.Connection:
+    path = WS / ".sal" / "search.db"
+    if readonly:
+        # Schema setup and WAL mode are left to a writable connection
+        return sqlite3.connect(path.absolute().as_uri() + "?mode=ro", uri=True,
+                               check_same_thread=check_same_thread)
+    db = sqlite3.connect(path, check_same_thread=check_same_thread)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    db.execute("PRAGMA temp_store=MEMORY")
+    if db.execute("PRAGMA user_version").fetchone()[0] != SCHEMA:
+        # Dropped rows are re-inserted by the next ensure_indexed
+        db.execute("DROP TABLE IF EXISTS docs")
+        db.execute("DROP TABLE IF EXISTS doc_meta")
+        db.execute("DROP TABLE IF EXISTS cards")
+        db.execute("CREATE VIRTUAL TABLE docs USING "
+                   "fts5(path UNINDEXED, title, topics, body, tokenize='porter unicode61')")
+        # Persistent rank function: title and topic hits outweigh body hits
+        db.execute("INSERT INTO docs(docs, rank) VALUES ('rank', 'bm25(0.0, 8.0, 4.0, 1.0)')")
+        # Source mtime at the time each docs row was written
+        db.execute("CREATE TABLE doc_meta(path TEXT PRIMARY KEY, mtime REAL)")
+        # Parsed copy of each .sal/index/*.json, keyed by card file name
+        db.execute("CREATE TABLE cards(name TEXT PRIMARY KEY, mtime REAL, json TEXT)")
+        db.execute(f"PRAGMA user_version={SCHEMA}")
     db.commit()
     return db
 
 
-def _index_one(f: Path, client: anthropic.Anthropic) -> dict:
-    content = _read_file(f)[:15000]
-    r = client.messages.create(model=MODEL, max_tokens=2048, system=CARD_PROMPT,
-        messages=[{"role": "user", "content": f"path: {f.name}\n\n{content}"}])
-    text = r.content[0].text.strip()
-    if text.startswith("```"):
-        _, _, text = text.partition("\n")
-        text = text.rstrip("`").strip()
-    card = json.loads(text)
+def _open_reader() -> sqlite3.Connection:
+    db = _open_db(check_same_thread=False, readonly=True)  # pooled, so it may change threads
+    db.execute("PRAGMA cache_size=-64000")    # 64 MB page cache
+    db.execute("PRAGMA mmap_size=268435456")  # map up to 256 MB of the file
+    return db
+
+
+def fts_query_ok(q: str) -> bool:
+    """Reject FTS5 queries that cannot parse without asking SQLite.
+
+    Catches unbalanced quotes and queries with no searchable word (e.g. "*");
+    subtler errors still surface as sqlite3.OperationalError.
+    """
+    if q.count('"') % 2:
+        return False
+    return any(w not in _FTS_OPERATORS for w in _WORD_RE.findall(q))
+
+
+@contextlib.contextmanager
+def reader() -> Iterator[sqlite3.Connection]:
+    """Borrow a read connection to WS's search.db from a small pool.
+
+    Connections outlive requests, so each keeps its page cache and skips the
+    open and schema check; WAL lets pooled readers run concurrently. They are
+    opened read-only, so a request can never write to the index.
+    """
+    global _POOL
+    path = WS / ".sal" / "search.db"
+    with _POOL_LOCK:
+        if _POOL is None or _POOL[0] != path:
+            while _POOL is not None and not _POOL[1].empty():
+                _POOL[1].get_nowait().close()
+            _open_db().close()  # create or migrate the schema for read-only connections
+            _POOL = (path, queue.Queue(maxsize=POOL_SIZE))
+        pool = _POOL[1]
+    try:
+        db = pool.get_nowait()
+    except queue.Empty:
+        db = _open_reader()
+    try:
+        yield db
+    finally:
+        try:
+            pool.put_nowait(db)
+        except queue.Full:
+            db.close()
+
+
+def load_cards(db: sqlite3.Connection) -> tuple[dict[str, dict], set[str]]:
+    """Return every card under .sal/index by file name, and the names of card
+    files that were added, edited or removed since they were last cached.
+
+    Card files stay the editable source of truth; the cards table only saves
+    re-reading files whose mtime has not changed since they were cached.
+    """
+    cached = {name: (mtime, text) for name, mtime, text in
+              db.execute("SELECT name, mtime, json FROM cards")}
+    cards, changed = {}, []
+    for cp in sorted((WS / ".sal" / "index").glob("*.json")):
+        mtime = cp.stat().st_mtime
+        hit = cached.pop(cp.name, None)
+        if hit and hit[0] == mtime:
+            text = hit[1]
+        else:
+            text = cp.read_bytes()
+            changed.append((cp.name, mtime, text))
+        cards[cp.name] = _loads(text)
+    db.executemany("INSERT OR REPLACE INTO cards(name, mtime, json) VALUES (?,?,?)", changed)
+    db.executemany("DELETE FROM cards WHERE name=?", [(name,) for name in cached])
+    return cards, {name for name, _, _ in changed} | cached.keys()
+
+
+def rebuild_cards_index() -> None:
+    """Refresh lookups derived from CARDS; call after replacing its contents."""
+    global CARDS_VERSION, _TOPICS
+    CARDS_VERSION += 1
+    CARDS_BY_PATH.clear()
+    CARDS_BY_PATH.update((c.get("path"), c) for c in CARDS)
+    # One row per topic so a phrase cannot match across two topics
+    db = sqlite3.connect(":memory:", check_same_thread=False)
+    db.execute("CREATE VIRTUAL TABLE topics USING "
+               "fts5(path UNINDEXED, topic, tokenize='porter unicode61')")
+    db.executemany("INSERT INTO topics(path, topic) VALUES (?,?)",
+                   [(c.get("path"), t) for c in CARDS for t in c.get("topics", [])])
+    _TOPICS = (CARDS, len(CARDS), db)
+
+
+def cards_with_topic(topic: str) -> list[dict] | None:
+    """Cards with a topic containing topic's words, the last one as a prefix, in CARDS order.
+
+    Unlike a substring scan this matches whole words and word prefixes, with
+    stemming: "vol" and "volatilities" find "local volatility", "latility" does not.
+
+    Returns None when the topic index was not built for the current CARDS, or
+    when topic has punctuation the tokenizer would drop ("C++" would match as
+    "c*"), so callers can fall back to a substring scan.
+    """
+    if (_TOPICS is None or _TOPICS[0] is not CARDS or _TOPICS[1] != len(CARDS)
+            or _TOPIC_PUNCT_RE.search(topic)):
+        return None
+    phrase = '"' + topic.replace('"', '""') + '"*'
+    try:
+        rows = _TOPICS[2].execute("SELECT path FROM topics WHERE topic MATCH ? "
+                                  "GROUP BY path ORDER BY min(rowid)", (phrase,)).fetchall()
+    except sqlite3.OperationalError:
+        return None
+    found = [CARDS_BY_PATH.get(p) for (p,) in rows]
+    return None if None in found else found
+
+
+def _prepare(card: dict) -> dict:
+    """Attach derived request-time fields. They start with '_' and are never saved."""
+    card["_topics_lc"] = [t.lower() for t in card.get("topics", [])]
+    card["_display_title"] = card.get("title") or card.get("path")
+    card["_has_topics"] = bool(card.get("topics"))
+    name = card.get("path", "").rsplit("/", 1)[-1]
+    card["_card_file"] = str(WS / ".sal" / "index" / (name + ".json"))
+    return card
+
+
+def public_card(card: dict) -> dict:
+    """card without the derived fields added by _prepare."""
+    return {k: v for k, v in card.items() if not k.startswith("_")}
+
+
+def _card_params(f: Path, content: str) -> dict:
+    return dict(model=MODEL, max_tokens=2048, system=CARD_PROMPT,
+                messages=[{"role": "user", "content": f"path: {f.name}\n\n{content}"}])
+
+
+def _extract_json(text: str, kind: type):
+    """Decode the first JSON value of type kind in text, ignoring fences or prose around it.
+
+    Bracketed prose such as "see [2]" is skipped by retrying from the next
+    "{" or "["; a list only counts if it holds objects. Raises ValueError when
+    no such value is found.
+    """
+    for m in _JSON_START_RE.finditer(text):
+        try:
+            value = _DECODER.raw_decode(text, m.start())[0]
+        except json.JSONDecodeError:
+            continue
+        if isinstance(value, kind) and (
+                kind is not list or all(isinstance(v, dict) for v in value)):
+            return value
+    raise ValueError(f"no JSON {kind.__name__} found")
+
+
+def _parse_card(text: str, f: Path) -> dict:
+    card = _extract_json(text, dict)
     card["path"] = str(f.relative_to(WS))
     return card
 
 
-def ensure_indexed(client: anthropic.Anthropic) -> list[dict]:
-    (WS / ".sal" / "index").mkdir(parents=True, exist_ok=True)
+def _group(contents: dict[Path, str]) -> list[list[Path]]:
+    """Pack small text documents into shared card requests; PDFs and large files go alone.
+
+    A token limit of 0 (negative values count as 0) turns grouping off.
+    """
+    limit = _env_int("SAL_BATCH_TOKENS", GROUP_TOKENS, 0)
+    if limit == 0:
+        return [[f] for f in contents]
+    groups, small, size = [], [], 0
+    for f, content in contents.items():
+        tokens = len(content) // 4
+        if f.suffix.lower() == ".pdf" or tokens > limit // 2:
+            groups.append([f])
+            continue
+        if small and (size + tokens > limit or len(small) == GROUP_FILES):
+            groups.append(small)
+            small, size = [], 0
+        small.append(f)
+        size += tokens
+    if small:
+        groups.append(small)
+    return groups
+
+
+def _group_params(files: list[Path], contents: dict[Path, str]) -> dict:
+    if len(files) == 1:
+        return _card_params(files[0], contents[files[0]])
+    text = "\n\n=====\n\n".join(f"path: {f.name}\n\n{contents[f]}" for f in files)
+    return dict(model=MODEL, max_tokens=min(2048 * len(files), MAX_TOKENS),
+                system=CARD_PROMPT + GROUP_PROMPT,
+                messages=[{"role": "user", "content": text}])
+
+
+def _parse_cards(text: str, files: list[Path]) -> dict[Path, dict]:
+    """Cards from a group response by file; documents the model skipped are left out."""
+    if len(files) == 1:
+        return {files[0]: _parse_card(text, files[0])}
+    items = _extract_json(text, list)
+    cards = {}
+    for card in items:
+        i = card.pop("index", None) if isinstance(card, dict) else None
+        if isinstance(i, int) and 0 <= i < len(files):
+            card["path"] = str(files[i].relative_to(WS))
+            cards[files[i]] = card
+    return cards
+
+
+def _index_group(files: list[Path], client: anthropic.Anthropic,
+                 contents: dict[Path, str]) -> dict[Path, dict]:
+    r = client.messages.create(**_group_params(files, contents))
+    return _parse_cards(r.content[0].text, files)
+
+
+def _index_one(f: Path, client: anthropic.Anthropic, content: str | None = None) -> dict:
+    if content is None:
+        content = _read_file_prefix(f)
+    r = client.messages.create(**_card_params(f, content))
+    return _parse_card(r.content[0].text, f)
+
+
+def _save_card(f: Path, card: dict) -> tuple[str, float, bytes]:
+    """Write f's card to .sal/index and return its row for the cards table."""
+    cp = WS / ".sal" / "index" / (f.name + ".json")
+    cp.write_bytes(data := _dumps(card))
+    return cp.name, cp.stat().st_mtime, data
+
+
+def _index_batch(contents: dict[Path, str],
+                 client: anthropic.Anthropic) -> dict[Path, tuple[str, float, bytes]]:
+    """Index files as one Message Batches job, saving cards as results arrive.
+
+    Returns the saved cards' table rows by file; failed requests are left out.
+    """
+    groups = _group(contents)
+    # custom_id only allows [a-zA-Z0-9_-], so key requests by position
+    batch = client.messages.batches.create(requests=[
+        {"custom_id": f"doc-{i}", "params": _group_params(files, contents)}
+        for i, files in enumerate(groups)])
+    while client.messages.batches.retrieve(batch.id).processing_status != "ended":
+        time.sleep(BATCH_POLL)
+    saved = {}
+    for r in client.messages.batches.results(batch.id):
+        files = groups[int(r.custom_id.removeprefix("doc-"))]
+        names = ", ".join(f.name for f in files)
+        if r.result.type != "succeeded":
+            print(f"  · {names} failed ({r.result.type})")
+            continue
+        try:
+            cards = _parse_cards(r.result.message.content[0].text, files)
+        except ValueError:
+            print(f"  · {names} failed (invalid JSON)")
+            continue
+        saved.update((f, _save_card(f, card)) for f, card in cards.items())
+    return saved
+
+
+def _throttle(window: deque, tokens: int) -> None:
+    """Block until a request of ~tokens input tokens fits the per-minute budget."""
+    while True:
+        now = time.monotonic()
+        while window and now - window[0][0] >= 60:
+            window.popleft()
+        if not window or (len(window) < RPM and sum(t for _, t in window) + tokens <= TPM):
+            window.append((now, tokens))
+            return
+        time.sleep(60 - (now - window[0][0]))
+
+
+def _index_parallel(contents: dict[Path, str],
+                    client: anthropic.Anthropic) -> dict[Path, tuple[str, float, bytes]]:
+    """Index files with concurrent messages.create calls, saving each card as it completes.
+
+    Returns the saved cards' table rows by file; failed files are left out.
+    """
+    window, saved = deque(), {}
+    workers = _env_int("SAL_INDEX_CONCURRENCY", WORKERS, 1)
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        futures = {}
+        for files in _group(contents):
+            system = CARD_PROMPT if len(files) == 1 else CARD_PROMPT + GROUP_PROMPT
+            tokens = sum(len(contents[f]) for f in files) + len(system)
+            _throttle(window, tokens // 4)
+            futures[ex.submit(_index_group, files, client, contents)] = files
+        for fut in as_completed(futures):
+            names = ", ".join(f.name for f in futures[fut])
+            try:
+                cards = fut.result()
+            except (anthropic.APIError, ValueError) as e:
+                print(f"  · {names} failed ({e.__class__.__name__})")
+                continue
+            saved.update((f, _save_card(f, card)) for f, card in cards.items())
+            print(f"  · indexed {names}")
+    return saved
+
+
+def ensure_indexed(client: anthropic.Anthropic, batch: bool = False) -> list[dict]:
+    index_dir = WS / ".sal" / "index"
+    index_dir.mkdir(parents=True, exist_ok=True)
+    files = _resources()
+    have = set(os.listdir(index_dir))
+    stale = [f for f in files if f.name + ".json" not in have]
     db = _open_db()
-    cards = []
-    for f in _resources():
-        cp = WS / ".sal" / "index" / (f.name + ".json")
-        if not cp.exists():
-            print(f"  · indexing {f.name}…", end="", flush=True)
-            card = _index_one(f, client)
-            cp.write_text(json.dumps(card, indent=2))
-            print(" done")
+    indexed = dict(db.execute("SELECT path, mtime FROM doc_meta"))
+    mtimes = {str(f.relative_to(WS)): f.stat().st_mtime for f in files}
+    outdated = {p for p, m in mtimes.items() if indexed.get(p) != m}
+    # Extract each stale document once; the card request and FTS insert share
+    # it. If the FTS row is current only the card prefix is needed.
+    bodies = {f: _read_file(f) for f in stale if str(f.relative_to(WS)) in outdated}
+    contents = {f: _prefix(bodies[f]) if f in bodies else _read_file_prefix(f)
+                for f in stale}
+    if len(stale) == 1:
+        print(f"  · indexing {stale[0].name}…", end="", flush=True)
+        try:
+            card = _index_one(stale[0], client, contents[stale[0]])
+        except (anthropic.APIError, ValueError) as e:
+            print(f" failed ({e.__class__.__name__})")
+            fresh = {}
         else:
-            card = json.loads(cp.read_text())
-        cards.append(card)
+            fresh = {stale[0]: _save_card(stale[0], card)}
+            print(" done")
+    elif stale and not batch:
+        fresh = _index_parallel(contents, client)
+    elif stale:
+        print(f"  · indexing {len(stale)} documents as a batch…", end="", flush=True)
+        fresh = _index_batch(contents, client)
+        print(f" {len(fresh)} done")
+    else:
+        fresh = {}
+    # Cards are on disk already; seed the card cache so load_cards does not
+    # read back what was just written
+    db.executemany("INSERT OR REPLACE INTO cards(name, mtime, json) VALUES (?,?,?)",
+                   fresh.values())
+
+    by_name, changed = load_cards(db)
+    changed.update(name for name, _, _ in fresh.values())
+    cards, rows, retitled = [], [], []
+    for f in files:
+        card = by_name.get(f.name + ".json")
+        if card:
+            cards.append(_prepare(card))
 
         path_key = str(f.relative_to(WS))
-        if not db.execute("SELECT 1 FROM docs WHERE path=?", (path_key,)).fetchone():
-            db.execute("INSERT INTO docs(path, body) VALUES (?,?)",
-                       (path_key, _read_file(f)))
+        card = card or {}
+        title, topics = card.get("title"), ", ".join(card.get("topics", []))
+        if path_key in outdated:
+            rows.append((path_key, title, topics, bodies[f] if f in bodies else _read_file(f)))
+        elif f.name + ".json" in changed:
+            # Card written or edited after its body row: refresh the boosted columns
+            retitled.append((title, topics, path_key))
+    # Replace rows for new or modified files and drop rows for deleted ones
+    gone = [(p,) for p in indexed.keys() - mtimes.keys()]
+    db.executemany("DELETE FROM docs WHERE path=?", [(p,) for p in outdated] + gone)
+    db.executemany("DELETE FROM doc_meta WHERE path=?", gone)
+    db.executemany("INSERT INTO docs(path, title, topics, body) VALUES (?,?,?,?)", rows)
+    db.executemany("UPDATE docs SET title=?, topics=? WHERE path=?", retitled)
+    db.executemany("INSERT OR REPLACE INTO doc_meta(path, mtime) VALUES (?,?)",
+                   [(p, mtimes[p]) for p in outdated])
+    if outdated or gone or retitled:
+        db.execute("INSERT INTO docs(docs) VALUES ('optimize')")
     db.commit()
+    db.execute("PRAGMA optimize")
     db.close()
     return cards
 
 
+def _env_int(name: str, default: int, minimum: int) -> int:
+    """Integer setting from the environment, read when used so a bad value only
+    affects the commands that need it."""
+    raw = os.environ.get(name, "").strip()
+    if not raw:
+        return default
+    try:
+        return max(int(raw), minimum)
+    except ValueError:
+        sys.exit(f"Error: {name} must be an integer, got {raw!r}")
+
+
 def get_api_key() -> str:
     if key := os.environ.get("ANTHROPIC_API_KEY"):
         return key
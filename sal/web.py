@@ -1,27 +1,101 @@
 """Flask web UI for browsing the sal knowledge base."""
-import json
+import functools
+import gzip
+import hashlib
 import sqlite3
 from pathlib import Path
-from flask import Flask, request, render_template
-from sal.core import CARDS, WS, _open_db
+from flask import Flask, Response, request, render_template
+from markupsafe import Markup, escape
+import sal.core as core
+from sal.core import CARDS, CARDS_BY_PATH, fts_query_ok, public_card, reader, to_json
 
 app = Flask(__name__)
+app.config["SEND_FILE_MAX_AGE_DEFAULT"] = 86400
+# Content hash in the stylesheet URL, so an upgraded sal.css is fetched at once
+app.jinja_env.globals["css_version"] = hashlib.md5(
+    (Path(app.static_folder) / "sal.css").read_bytes(), usedforsecurity=False).hexdigest()[:8]
+
+# Control characters mark matches so the snippet text can be escaped first
+_SQL_SEARCH = ("SELECT path, snippet(docs, 3, char(2), char(3), '…', 24) "
+               "FROM docs WHERE docs MATCH ? ORDER BY rank LIMIT 20")
+
+
+@functools.lru_cache(maxsize=1024)
+def _card_json(path: str, version: int) -> str:
+    return to_json(public_card(CARDS_BY_PATH[path]), indent=True)
+
+
+def _highlight(snippet: str | None) -> Markup:
+    """Escape a snippet once and turn its match markers into <b> tags."""
+    return Markup(str(escape(snippet or "")).replace("\x02", "<b>").replace("\x03", "</b>"))
+
+
+def _compressed(html: str) -> tuple[bytes, bytes]:
+    body = html.encode()
+    return body, gzip.compress(body, 5)
+
+
+def _send(page: tuple[bytes, bytes]) -> Response:
+    """Send a cached page, pre-gzipped when the client accepts it."""
+    body, gz = page
+    if "gzip" in request.accept_encodings:
+        resp = Response(gz, mimetype="text/html")
+        resp.headers["Content-Encoding"] = "gzip"
+    else:
+        resp = Response(body, mimetype="text/html")
+    resp.vary.add("Accept-Encoding")
+    return resp
+
+
+# The index page only changes when CARDS is rebuilt, which bumps
+# core.CARDS_VERSION; card edits from another process show up on restart
+@functools.lru_cache(maxsize=1)
+def _index_page(version: int) -> tuple[bytes, bytes]:
+    return _compressed(render_template("index.html", cards=CARDS))
+
+
+def _index_stamp() -> tuple[int, ...]:
+    """Changes whenever search.db is written, including by a `sal init` elsewhere."""
+    db = core.WS / ".sal" / "search.db"
+    stamp = ()
+    for p in (db, db.with_name(db.name + "-wal")):
+        try:
+            st = p.stat()
+            stamp += (st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            stamp += (0, 0)
+    return stamp
+
+
+# Raises sqlite3.OperationalError rather than caching a page for it
+@functools.lru_cache(maxsize=256)
+def _search_page(q: str, stamp: tuple[int, ...]) -> tuple[bytes, bytes]:
+    with reader() as db:
+        rows = [(p, _highlight(s)) for p, s in db.execute(_SQL_SEARCH, (q,))]
+    return _compressed(render_template("search.html", query=q, results=rows, error=None))
+
+
+@functools.lru_cache(maxsize=1)
+def _not_found_parts() -> tuple[bytes, bytes]:
+    """error.html rendered once and split around the path; 404s skip Jinja."""
+    prefix, suffix = render_template("error.html", path="\0").encode().split(b"\0")
+    return prefix, suffix
 
 
 @app.route("/")
 def index():
-    return render_template("index.html", cards=CARDS)
+    return _send(_index_page(core.CARDS_VERSION))
 
 
 @app.route("/card/<path:path>")
 def card(path):
-    for c in CARDS:
-        if c.get("path") == path:
-            card_file = str(WS / ".sal" / "index" / (Path(path).name + ".json"))
-            return render_template("card.html", card=c,
-                                   card_file=card_file,
-                                   card_json=json.dumps(c, indent=2))
-    return render_template("error.html", path=path), 404
+    c = CARDS_BY_PATH.get(path)
+    if c is None:
+        prefix, suffix = _not_found_parts()
+        return Response(prefix + str(escape(path)).encode() + suffix, 404, mimetype="text/html")
+    return render_template("card.html", card=c,
+                           card_file=c["_card_file"],
+                           card_json=_card_json(path, core.CARDS_VERSION))
 
 
 @app.route("/search")
@@ -29,17 +103,11 @@ def search():
     q = request.args.get("q", "").strip()
     if not q:
         return render_template("search.html", query="", results=[], error=None)
-    db = _open_db()
-    error = None
-    try:
-        rows = db.execute("""
-            SELECT path, snippet(docs, 1, '<b>', '</b>', '…', 24)
-            FROM docs WHERE docs MATCH ?
-            ORDER BY rank LIMIT 20
-        """, (q,)).fetchall()
-    except sqlite3.OperationalError:
-        rows = []
-        error = "Invalid search query syntax."
-    db.close()
-    results = [{"path": p, "snippet": s} for p, s in rows]
-    return render_template("search.html", query=q, results=results, error=error)
+    error = "Invalid search query syntax."
+    if fts_query_ok(q):
+        try:
+            return _send(_search_page(q, _index_stamp()))
+        except sqlite3.OperationalError as e:
+            if str(e).startswith(("database is locked", "no such table")):
+                error = "Search is unavailable right now; try again."
+    return render_template("search.html", query=q, results=[], error=error)
@@ -1,6 +1,9 @@
 """Unit tests for sal — Anthropic API calls are mocked throughout."""
+import gzip
 import json
+import os
 import pytest
+import sqlite3
 from pathlib import Path
 from unittest.mock import MagicMock, patch
 
@@ -41,6 +44,28 @@ def test_read_pdf_via_fitz():
     assert result == "page content"
 
 
+def make_pdf(path: Path, pages: list[str]) -> Path:
+    doc = core.fitz.open()
+    for text in pages:
+        doc.new_page().insert_text((72, 72), text)
+    doc.save(str(path))
+    return path
+
+
+def test_read_file_prefix_stops_at_limit(tmp):
+    f = make_pdf(tmp / "doc.pdf", ["first page", "second page", "third page"])
+    with patch("sal.core._prefix", side_effect=lambda text, limit: text):
+        assert "third" not in core._read_file_prefix(f, 15)
+    assert core._read_file_prefix(f, 12).strip() == "first page"
+
+
+def test_read_file_prefix_skips_heavy_pages_once_text_collected(tmp):
+    f = make_pdf(tmp / "doc.pdf", ["first page", "drawing", "third page"])
+    with patch.object(core, "HEAVY_SKIP", 1), patch.object(core, "HEAVY_PAGE", 0):
+        assert core._read_file_prefix(f).strip() == "first page"
+    assert "third page" in core._read_file_prefix(f)
+
+
 # ── _resources ────────────────────────────────────────────────────────────────
 
 def test_resources_lists_supported_extensions(tmp):
@@ -53,6 +78,13 @@ def test_resources_lists_supported_extensions(tmp):
     assert "ignore.xyz" not in names
 
 
+def test_resources_skips_directories_but_keeps_hidden_files(tmp):
+    (tmp / "dir.md").mkdir()
+    (tmp / ".hidden.md").touch()
+    (tmp / "UPPER.PDF").touch()
+    assert [f.name for f in core._resources()] == [".hidden.md", "UPPER.PDF"]
+
+
 def test_resources_empty_when_no_matching_files(tmp):
     (tmp / "ignore.xyz").touch()
     assert core._resources() == []
@@ -87,6 +119,233 @@ def test_index_one_strips_code_fences(tmp):
     assert result["title"] == "Fenced"
 
 
+def test_index_one_ignores_text_around_json(tmp):
+    card = {"title": "Wrapped {braces}", "topics": []}
+    response = MagicMock()
+    response.content = [MagicMock(text=f"\ufeffHere is the card:\n{json.dumps(card)}\nDone.")]
+    client = MagicMock()
+    client.messages.create.return_value = response
+    f = tmp / "doc.txt"
+    f.write_text("content")
+    assert core._index_one(f, client)["title"] == "Wrapped {braces}"
+
+
+def test_index_one_skips_bracketed_prose_before_card(tmp):
+    response = MagicMock()
+    response.content = [MagicMock(text='Per section [2]:\n{"title": "Doc", "topics": []}')]
+    client = MagicMock()
+    client.messages.create.return_value = response
+    f = tmp / "doc.txt"
+    f.write_text("content")
+    assert core._index_one(f, client)["title"] == "Doc"
+    with pytest.raises(ValueError):
+        core._parse_card("See [2] and [3].", f)
+
+
+# ── ensure_indexed ───────────────────────────────────────────────────────────
+
+def batch_result(custom_id: str, card: dict | None) -> MagicMock:
+    r = MagicMock(custom_id=custom_id)
+    if card is None:
+        r.result.type = "errored"
+    else:
+        r.result.type = "succeeded"
+        r.result.message.content = [MagicMock(text=json.dumps(card))]
+    return r
+
+
+def test_ensure_indexed_single_stale_file_uses_messages_create(tmp):
+    (tmp / "doc.txt").write_text("content")
+    client = mock_client({"title": "Doc", "topics": []})
+    cards = core.ensure_indexed(client)
+    assert [c["title"] for c in cards] == ["Doc"]
+    client.messages.batches.create.assert_not_called()
+    assert (tmp / ".sal" / "index" / "doc.txt.json").exists()
+
+
+def test_ensure_indexed_single_stale_file_failure_is_skipped(tmp):
+    (tmp / "doc.txt").write_text("content")
+    client = MagicMock()
+    client.messages.create.return_value.content = [MagicMock(text="no card here")]
+    assert core.ensure_indexed(client) == []
+    assert not (tmp / ".sal" / "index" / "doc.txt.json").exists()
+    db = core._open_db()
+    assert db.execute("SELECT path, title FROM docs").fetchall() == [("doc.txt", None)]
+    db.close()
+
+
+def test_ensure_indexed_batches_multiple_stale_files(tmp):
+    (tmp / "a.txt").write_text("alpha")
+    (tmp / "b.md").write_text("beta")
+    client = MagicMock()
+    client.messages.batches.create.return_value.id = "batch-1"
+    client.messages.batches.retrieve.return_value.processing_status = "ended"
+    client.messages.batches.results.return_value = [
+        batch_result("doc-1", {"title": "B"}), batch_result("doc-0", None)]
+    with patch.object(core, "GROUP_TOKENS", 0):
+        cards = core.ensure_indexed(client, batch=True)
+    requests = client.messages.batches.create.call_args.kwargs["requests"]
+    assert [r["custom_id"] for r in requests] == ["doc-0", "doc-1"]
+    client.messages.create.assert_not_called()
+    assert [c["title"] for c in cards] == ["B"]
+    assert not (tmp / ".sal" / "index" / "a.txt.json").exists()
+
+
+def test_ensure_indexed_parallel_indexes_every_stale_file(tmp):
+    for name in ("a.txt", "b.txt", "c.txt"):
+        (tmp / name).write_text(name)
+    with patch.object(core, "GROUP_TOKENS", 0):
+        cards = core.ensure_indexed(mock_client({"title": "T", "topics": []}))
+    assert [c["path"] for c in cards] == ["a.txt", "b.txt", "c.txt"]
+
+
+def test_index_parallel_saves_each_card_as_it_completes(tmp):
+    (tmp / ".sal" / "index").mkdir(parents=True)
+    contents = {tmp / "a.txt": "alpha", tmp / "b.txt": "beta"}
+    with patch.object(core, "GROUP_TOKENS", 0):
+        saved = core._index_parallel(contents, mock_client({"title": "T"}))
+    assert sorted(name for name, _, _ in saved.values()) == ["a.txt.json", "b.txt.json"]
+    assert json.loads((tmp / ".sal" / "index" / "b.txt.json").read_text())["path"] == "b.txt"
+
+
+def test_index_concurrency_setting_is_validated_when_used():
+    with patch.dict(os.environ, {"SAL_INDEX_CONCURRENCY": "0"}):
+        assert core._env_int("SAL_INDEX_CONCURRENCY", core.WORKERS, 1) == 1
+    with patch.dict(os.environ, {"SAL_INDEX_CONCURRENCY": "many"}), \
+         pytest.raises(SystemExit, match="SAL_INDEX_CONCURRENCY must be an integer"):
+        core._env_int("SAL_INDEX_CONCURRENCY", core.WORKERS, 1)
+
+
+def test_ensure_indexed_groups_small_documents(tmp):
+    for name in ("a.txt", "b.txt", "c.txt"):
+        (tmp / name).write_text(name)
+    response = MagicMock()
+    response.content = [MagicMock(text=json.dumps(
+        [{"index": 2, "title": "C"}, {"index": 0, "title": "A"}]))]
+    client = MagicMock()
+    client.messages.create.return_value = response
+    cards = core.ensure_indexed(client)
+    assert client.messages.create.call_count == 1
+    assert "path: b.txt" in client.messages.create.call_args.kwargs["messages"][0]["content"]
+    assert [(c["path"], c["title"]) for c in cards] == [("a.txt", "A"), ("c.txt", "C")]
+    assert "index" not in cards[0]
+
+
+def test_parse_cards_skips_bracketed_prose_before_array(tmp):
+    files = [tmp / "a.txt", tmp / "b.txt"]
+    text = 'Documents [0] and [1]:\n[{"index": 1, "title": "B"}, {"index": 0, "title": "A"}]'
+    cards = core._parse_cards(text, files)
+    assert {f.name: c["title"] for f, c in cards.items()} == {"a.txt": "A", "b.txt": "B"}
+
+
+def test_group_keeps_pdfs_and_large_files_alone():
+    contents = {Path("a.md"): "x" * 100, Path("b.pdf"): "x", Path("c.txt"): "x" * 100,
+                Path("big.txt"): "x" * 20000, Path("d.md"): "x" * 100}
+    with patch.object(core, "GROUP_TOKENS", 60):
+        groups = core._group(contents)
+    assert [[f.name for f in g] for g in groups] == [
+        ["b.pdf"], ["big.txt"], ["a.md", "c.txt"], ["d.md"]]
+
+
+def test_group_caps_files_per_request():
+    contents = {Path(f"{i}.md"): "" for i in range(20)}
+    groups = core._group(contents)
+    assert [len(g) for g in groups] == [8, 8, 4]
+    assert core._group_params(groups[0], contents)["max_tokens"] <= core.MAX_TOKENS
+    with patch.object(core, "GROUP_TOKENS", 0):
+        assert len(core._group(contents)) == 20
+    with patch.dict(os.environ, {"SAL_BATCH_TOKENS": "-5"}):
+        assert len(core._group(contents)) == 20
+    with patch.dict(os.environ, {"SAL_BATCH_TOKENS": "8k"}), pytest.raises(SystemExit):
+        core._group(contents)
+
+
+def test_throttle_waits_when_window_is_full():
+    window = core.deque((0.0, 1) for _ in range(core.RPM))
+    with patch("sal.core.time.monotonic", side_effect=[30.0, 60.0]), \
+         patch("sal.core.time.sleep") as sleep:
+        core._throttle(window, 1)
+    sleep.assert_called_once_with(30.0)
+    assert len(window) == 1
+
+
+def test_ensure_indexed_retitles_rows_when_cards_change(tmp):
+    (tmp / "a.txt").write_text("alpha")
+    (tmp / "b.txt").write_text("beta")
+    first = mock_client({"title": "B"})
+    first.messages.create.side_effect = lambda **kw: (
+        MagicMock(content=[MagicMock(text="no card")])
+        if "path: a.txt" in kw["messages"][0]["content"]
+        else first.messages.create.return_value)
+    with patch.object(core, "GROUP_TOKENS", 0):
+        core.ensure_indexed(first)
+    core.ensure_indexed(mock_client({"title": "A", "topics": ["alpha"]}))
+    card_file = tmp / ".sal" / "index" / "a.txt.json"
+    card_file.write_text(json.dumps({"path": "a.txt", "title": "A2", "topics": []}))
+    os.utime(card_file, (1, 1))
+    with patch("sal.core._read_file") as read:
+        core.ensure_indexed(mock_client({}))
+    read.assert_not_called()
+    db = core._open_db()
+    assert db.execute("SELECT path, title, topics FROM docs ORDER BY path").fetchall() == [
+        ("a.txt", "A2", ""), ("b.txt", "B", "")]
+    db.close()
+
+
+def test_ensure_indexed_reads_each_file_once(tmp):
+    (tmp / "doc.txt").write_text("content")
+    with patch("sal.core._read_file", wraps=core._read_file) as read:
+        core.ensure_indexed(mock_client({"title": "Doc", "topics": []}))
+    assert read.call_count == 1
+
+
+def test_ensure_indexed_refreshes_modified_and_deleted_files(tmp):
+    client = mock_client({"title": "Doc", "topics": []})
+    (tmp / "a.txt").write_text("old text")
+    (tmp / "b.txt").write_text("removed soon")
+    core.ensure_indexed(client)
+    (tmp / "a.txt").write_text("new text")
+    os.utime(tmp / "a.txt", (1, 1))
+    (tmp / "b.txt").unlink()
+    core.ensure_indexed(client)
+    db = core._open_db()
+    assert db.execute("SELECT path, body FROM docs").fetchall() == [("a.txt", "new text")]
+    assert db.execute("SELECT path, mtime FROM doc_meta").fetchall() == [("a.txt", 1.0)]
+    db.close()
+
+
+def test_load_cards_reads_only_changed_card_files(tmp):
+    index = tmp / ".sal" / "index"
+    index.mkdir(parents=True)
+    (index / "a.txt.json").write_text(json.dumps({"title": "A"}))
+    (index / "b.txt.json").write_text(json.dumps({"title": "B"}))
+    db = core._open_db()
+    core.load_cards(db)
+    (index / "b.txt.json").write_text(json.dumps({"title": "B2"}))
+    os.utime(index / "b.txt.json", (1, 1))
+    with patch.object(Path, "read_bytes", autospec=True, side_effect=Path.read_bytes) as read:
+        cards, changed = core.load_cards(db)
+    assert [p.name for (p,), _ in read.call_args_list] == ["b.txt.json"]
+    assert changed == {"b.txt.json"}
+    assert {n: c["title"] for n, c in cards.items()} == {"a.txt.json": "A", "b.txt.json": "B2"}
+    db.close()
+
+
+def test_ensure_indexed_does_not_reread_fresh_cards(tmp):
+    (tmp / "doc.txt").write_text("content")
+    with patch.object(Path, "read_bytes", autospec=True, side_effect=Path.read_bytes) as read:
+        cards = core.ensure_indexed(mock_client({"title": "Doc", "topics": []}))
+    assert cards[0]["title"] == "Doc"
+    read.assert_not_called()
+
+
+def test_prefix_cuts_at_line_break():
+    text = "a" * 10 + "\n" + "b" * 10
+    assert core._prefix(text, 15) == "a" * 10
+    assert core._prefix("c" * 20, 15) == "c" * 15
+    assert core._prefix(text) == text
+
+
 # ── Tools ─────────────────────────────────────────────────────────────────────
 
 def test_list_returns_cards():
@@ -112,6 +371,35 @@ def test_read_returns_content(tmp):
     assert result["content"] == "hello"
 
 
+def test_read_truncates_long_body(tmp):
+    (tmp / ".sal").mkdir()
+    db = core._open_db()
+    db.execute("INSERT INTO docs(path, body) VALUES (?, ?)", ("doc.txt", "x" * 20000))
+    db.commit(); db.close()
+    (tmp / "doc.txt").write_text("x" * 20000)
+    content = json.loads(Read("doc.txt"))["content"]
+    assert content.startswith("x" * 8000 + "\n…[truncated")
+
+
+def test_read_pdf_page_reuses_open_document(tmp):
+    make_pdf(tmp / "doc.pdf", ["first page", "second page"])
+    with patch("sal.core.fitz.open", wraps=core.fitz.open) as fitz_open:
+        assert "first page" in json.loads(Read("doc.pdf", page=0))["content"]
+        assert "second page" in json.loads(Read("doc.pdf", page=1))["content"]
+        assert "error" in json.loads(Read("doc.pdf", page=2))
+    assert fitz_open.call_count == 1
+
+
+def test_read_unindexed_file_extracts_once(tmp):
+    (tmp / ".sal").mkdir()
+    (tmp / "new.txt").write_text("not in the index yet")
+    with patch("sal.core._read_file", wraps=core._read_file) as read:
+        Read("new.txt")
+        result = json.loads(Read("new.txt"))
+    assert result["content"] == "not in the index yet"
+    assert read.call_count == 1
+
+
 def test_search_finds_match(tmp):
     (tmp / ".sal").mkdir()
     db = core._open_db()
@@ -133,6 +421,61 @@ def test_search_no_matches(tmp):
     assert result["results"] == []
 
 
+def test_search_matches_stemmed_forms(tmp):
+    (tmp / ".sal").mkdir()
+    db = core._open_db()
+    db.execute("INSERT INTO docs(path, body) VALUES (?, ?)",
+               ("notes.md", "volatilities were indexed"))
+    db.commit(); db.close()
+    result = json.loads(Search("volatility index"))
+    assert [r["path"] for r in result["results"]] == ["notes.md"]
+
+
+def test_search_ranks_title_hits_above_body_hits(tmp):
+    (tmp / ".sal").mkdir()
+    db = core._open_db()
+    db.executemany("INSERT INTO docs(path, title, topics, body) VALUES (?, ?, ?, ?)", [
+        ("body.md", "Other", "", "heston heston heston model"),
+        ("title.md", "The Heston model", "", "about stochastic volatility")])
+    db.commit(); db.close()
+    result = json.loads(Search("heston"))
+    assert [r["path"] for r in result["results"]] == ["title.md", "body.md"]
+
+
+def test_ensure_indexed_stores_card_title_and_topics(tmp):
+    (tmp / "doc.txt").write_text("content")
+    core.ensure_indexed(mock_client({"title": "Heston", "topics": ["vol", "pde"]}))
+    db = core._open_db()
+    assert db.execute("SELECT title, topics FROM docs").fetchall() == [("Heston", "vol, pde")]
+    db.close()
+
+
+def test_open_db_rebuilds_outdated_schema(tmp):
+    (tmp / ".sal").mkdir()
+    db = core.sqlite3.connect(tmp / ".sal" / "search.db")
+    db.execute("CREATE VIRTUAL TABLE docs USING fts5(path UNINDEXED, body)")
+    db.execute("INSERT INTO docs(path, body) VALUES ('old.md', 'stale')")
+    db.commit(); db.close()
+    db = core._open_db()
+    assert db.execute("SELECT count(*) FROM docs").fetchone()[0] == 0
+    assert db.execute("PRAGMA user_version").fetchone()[0] == core.SCHEMA
+    db.close()
+
+
+def test_reader_reuses_pooled_connections_per_workspace(tmp, tmp_path_factory):
+    (tmp / ".sal").mkdir()
+    with core.reader() as db:
+        with pytest.raises(sqlite3.OperationalError, match="readonly"):
+            db.execute("INSERT INTO docs(path, body) VALUES ('a', 'b')")
+    with core.reader() as again, core.reader() as second:
+        assert again is db
+        assert second is not db
+    other = tmp_path_factory.mktemp("other")
+    (other / ".sal").mkdir()
+    with patch.object(core, "WS", other), core.reader() as elsewhere:
+        assert elsewhere is not db
+
+
 def test_search_invalid_query(tmp):
     (tmp / ".sal").mkdir()
     core._open_db().close()
@@ -140,6 +483,95 @@ def test_search_invalid_query(tmp):
     assert "error" in result
 
 
+# ── Web ───────────────────────────────────────────────────────────────────────
+
+@pytest.fixture
+def web():
+    """A test client with the page caches emptied."""
+    from sal import web
+    for cached in (web._index_page, web._search_page, web._card_json):
+        cached.cache_clear()
+    return web.app.test_client()
+
+
+def test_web_search_renders_results(tmp, web):
+    (tmp / ".sal").mkdir()
+    db = core._open_db()
+    db.execute("INSERT INTO docs(path, body) VALUES (?, ?)", ("notes.md", "<i>local</i> volatility"))
+    db.commit(); db.close()
+    page = web.get("/search?q=volatility").get_data(as_text=True)
+    assert "1 result for" in page
+    assert "/read/notes.md" in page
+    assert "&lt;i&gt;local&lt;/i&gt; <b>volatility</b>" in page
+
+
+def test_web_search_follows_db_writes_and_skips_caching_errors(tmp, web):
+    (tmp / ".sal").mkdir()
+    core._open_db().close()
+    with patch("sal.web.reader", side_effect=sqlite3.OperationalError("database is locked")):
+        assert "unavailable" in web.get("/search?q=volatility").get_data(as_text=True)
+    assert "0 results" in web.get("/search?q=volatility").get_data(as_text=True)
+    db = core._open_db()
+    db.execute("INSERT INTO docs(path, body) VALUES ('a.md', 'local volatility')")
+    db.commit(); db.close()
+    assert "1 result for" in web.get("/search?q=volatility").get_data(as_text=True)
+
+
+def test_web_index_is_cached_and_gzipped(web):
+    with patch("sal.web.CARDS", [core._prepare({"path": "a.md", "title": "A"})]):
+        plain = web.get("/")
+        with patch("sal.web.render_template") as render:
+            zipped = web.get("/", headers={"Accept-Encoding": "gzip"})
+        render.assert_not_called()
+    assert zipped.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(zipped.get_data()) == plain.get_data()
+
+
+def test_web_stylesheet_is_static_and_cacheable(web):
+    from sal.web import app
+    html = web.get("/search").data
+    css = web.get("/static/sal.css")
+    version = app.jinja_env.globals["css_version"]
+    assert f'href="/static/sal.css?v={version}"'.encode() in html and b"<style>" not in html
+    assert css.mimetype == "text/css"
+    assert css.cache_control.max_age == 86400
+
+
+def test_web_index_lists_prepared_cards(web):
+    cards = [core._prepare({"path": "untitled.md", "topics": ["vol"]})]
+    with patch("sal.web.CARDS", cards):
+        page = web.get("/").get_data(as_text=True)
+    assert ">untitled.md</a>" in page
+    assert "<span>vol</span>" in page
+
+
+def test_web_card_looks_up_by_path(web):
+    with patch.object(core, "WS", Path("/kb")):
+        cards = [core._prepare({"title": "My Paper", "path": "paper.pdf"})]
+    with patch.object(core, "CARDS", cards), patch.dict(core.CARDS_BY_PATH, clear=True):
+        core.rebuild_cards_index()
+        page = web.get("/card/paper.pdf").get_data(as_text=True)
+        assert "My Paper" in page
+        assert "/kb/.sal/index/paper.pdf.json" in page
+        missing = web.get("/card/<missing>.pdf")
+        assert missing.status_code == 404
+        assert b"No card found for: &lt;missing&gt;.pdf" in missing.data
+
+
+def test_fts_query_ok_rejects_operator_only_queries():
+    assert core.fts_query_ok("local volatility")
+    assert core.fts_query_ok('"black scholes" NEAR pde')
+    for q in ("*", '"', "AND", "NEAR", "  ", 'vol "open'):
+        assert not core.fts_query_ok(q), q
+
+
+def test_search_invalid_query_skips_database(tmp):
+    with patch("sal.core.reader") as reader:
+        result = json.loads(Search("*"))
+    assert "error" in result
+    reader.assert_not_called()
+
+
 # ── List topic filtering ─────────────────────────────────────────────────────
 
 def test_list_topic_filters_match():
@@ -171,6 +603,54 @@ def test_list_topic_filters_case_insensitive():
     assert len(result["documents"]) == 1
 
 
+def test_list_uses_prepared_topics_and_hides_them():
+    cards = [core._prepare({"title": "A", "path": "a.pdf", "topics": ["Local Volatility"]})]
+    with patch.object(core, "CARDS", cards):
+        result = json.loads(List(topic="volatility"))
+    assert result["documents"] == [{"title": "A", "path": "a.pdf", "topics": ["Local Volatility"]}]
+
+
+def test_list_topic_uses_topic_index():
+    cards = [
+        {"title": "A", "path": "a.pdf", "topics": ["Local volatility", "Black-Scholes"]},
+        {"title": "B", "path": "b.pdf", "topics": ["credit risk"]},
+        {"title": "C", "path": "c.pdf", "topics": ["stochastic volatilities"]},
+    ]
+    with patch.object(core, "CARDS", cards), patch.dict(core.CARDS_BY_PATH, clear=True):
+        core.rebuild_cards_index()
+        assert [c["title"] for c in core.cards_with_topic("volatility")] == ["A", "C"]
+        titles = lambda t: [d["title"] for d in json.loads(List(topic=t))["documents"]]
+        assert titles("volatility") == ["A", "C"]
+        assert titles("black-schol") == ["A"]
+        assert titles("volatility black") == []
+        assert titles('"') == []
+
+
+def test_list_topic_with_punctuation_matches_substring():
+    cards = [
+        {"title": "A", "path": "a.pdf", "topics": ["C++ templates"]},
+        {"title": "B", "path": "b.pdf", "topics": ["credit risk", "calculus"]},
+    ]
+    with patch.object(core, "CARDS", cards), patch.dict(core.CARDS_BY_PATH, clear=True):
+        core.rebuild_cards_index()
+        assert core.cards_with_topic("C++") is None
+        assert [d["title"] for d in json.loads(List(topic="C++"))["documents"]] == ["A"]
+
+
+def test_list_topic_ignores_index_built_for_other_cards():
+    indexed = [{"title": "A", "path": "a.pdf", "topics": ["credit risk"]}]
+    with patch.object(core, "CARDS", indexed), patch.dict(core.CARDS_BY_PATH, clear=True):
+        core.rebuild_cards_index()
+    cards = [{"title": "B", "path": "b.pdf", "topics": ["credit"]}]
+    with patch.object(core, "CARDS", cards):
+        assert core.cards_with_topic("credit") is None
+        assert [d["title"] for d in json.loads(List(topic="credit"))["documents"]] == ["B"]
+    with patch.object(core, "CARDS", indexed), patch.dict(core.CARDS_BY_PATH, clear=True):
+        core.rebuild_cards_index()
+        indexed.append({"title": "C", "path": "c.pdf", "topics": ["credit"]})
+        assert core.cards_with_topic("credit") is None
+
+
 def test_list_topic_none_returns_all():
     cards = [
         {"title": "A", "path": "a.pdf", "topics": ["vol"]},